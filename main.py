@@ -1,22 +1,204 @@
 # main.py - FastAPI application for Railway deployment
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import requests
-from bs4 import BeautifulSoup
-import json
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+import httpx
+import asyncio
+import concurrent.futures
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+from selectolax.lexbor import LexborHTMLParser
+import orjson
 import time
 import random
 from urllib.parse import quote
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from collections import deque
+from typing import List, Optional, Dict, Any, Tuple
+import math
 import re
 from datetime import datetime, timedelta
 import os
+import hashlib
+import logging
 import uvicorn
 
+logger = logging.getLogger(__name__)
+
+# Precompiled patterns for the per-card extraction hot loop; bytes
+# patterns run against the undecoded response body
+_SEARCH_PAGE_STATE_BYTES_RE = re.compile(rb'"searchPageState":\s*({.*?})(?=,")')
+_NEXT_DATA_BYTES_RE = re.compile(rb'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+# JSON endpoint the Zillow frontend itself queries for search results
+ZILLOW_SEARCH_API_URL = "https://www.zillow.com/async-create-search-page-state"
+
+# Search pages run 1-3 MB but the searchPageState blob sits near the top;
+# reading past this point only buys markup we never look at
+MAX_HTML_BYTES = 512 * 1024
+
+# Upper bound on sub-requests per /search/batch call
+MAX_BATCH_SIZE = 50
+
+# Comma-union so the parser walks each card container query once; field
+# selectors are module constants so they are built (and compiled by the
+# selector engine) exactly once
+_PROPERTY_CARD_SEL = 'article[data-test="property-card"], .property-card-data, .list-card-info'
+_PRICE_SEL = '[data-test="property-card-price"]'
+_ADDRESS_SEL = '[data-test="property-card-addr"]'
+_DETAILS_SEL = '[data-test="property-card-details"]'
+_LINK_SEL = 'a[href]'
+
+# Single alternation so one finditer pass pulls beds, baths and sqft
+# out of the details text instead of three separate searches
+_DETAILS_RE = re.compile(
+    r'(?P<beds>\d+)\s*(?:bd|bed)'
+    r'|(?P<baths>\d+\.?\d*)\s*(?:ba|bath)'
+    r'|(?P<sqft>[\d,]+)\s*(?:sq\s*ft|sqft)',
+    re.IGNORECASE
+)
+
+# O(1) membership heuristic for "does this dict look like a listing"
+_LISTING_KEYS = frozenset({'address', 'price', 'beds', 'baths', 'zpid', 'detailUrl'})
+
+def _find_listings_in_json(data: Any) -> List[Dict]:
+    # Explicit worklist instead of recursion: the embedded page blobs
+    # nest tens of thousands of nodes, and this short-circuits as soon
+    # as a listing array turns up
+    stack = deque([data])
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key in ('listResults', 'mapResults'):
+                value = node.get(key)
+                if isinstance(value, list) and value:
+                    return value
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return []
+
+@lru_cache(maxsize=1024)
+def _city_state_slug(city: str, state: str) -> str:
+    return f"{city.lower().replace(' ', '-')}-{state.lower()}"
+
+def _property_payload(prop: "Property") -> Dict[str, Any]:
+    # Structured fields for clients plus the human-readable summary line
+    payload = asdict(prop)
+    payload["display"] = str(prop)
+    return payload
+
+def _haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Great-circle distance in miles. Plain math is fine here: comp lists
+    # top out at ten entries, so there is nothing to vectorize.
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlam = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
+    return 2 * 3958.8 * math.asin(math.sqrt(a))
+
+def _rank_comps_by_distance(subject: "Property", comps: List["Property"]) -> List["Property"]:
+    # Closest comps first; listings without coordinates sort last
+    if subject.latitude is None or subject.longitude is None:
+        return comps
+
+    def distance(comp: "Property") -> float:
+        if comp.latitude is None or comp.longitude is None:
+            return float("inf")
+        return _haversine_miles(subject.latitude, subject.longitude, comp.latitude, comp.longitude)
+
+    return sorted(comps, key=distance)
+
+def _bounds_key(map_bounds: Optional["MapBounds"]) -> Optional[tuple]:
+    if map_bounds is None:
+        return None
+    return (map_bounds.west, map_bounds.east, map_bounds.south, map_bounds.north)
+
+def _quantized_bounds_key(map_bounds: Optional["MapBounds"]) -> Optional[tuple]:
+    # Cache keys only: snap coords to ~11 m (4 decimals) so every map pan
+    # doesn't mint a fresh key. Upstream queries keep the exact bbox.
+    if map_bounds is None:
+        return None
+    return (
+        round(map_bounds.west, 4),
+        round(map_bounds.east, 4),
+        round(map_bounds.south, 4),
+        round(map_bounds.north, 4),
+    )
+
+@lru_cache(maxsize=1024)
+def _build_search_query_state(city: str, state: str, min_price: int, max_price: int, status: str, bounds_key: Optional[tuple]) -> Dict:
+    # Deterministic per argument tuple, so the dict (and its encoded form
+    # below) is built once per distinct query. Callers treat it as
+    # read-only.
+    bounds = {
+        "west": bounds_key[0] if bounds_key else -180,
+        "east": bounds_key[1] if bounds_key else 180,
+        "south": bounds_key[2] if bounds_key else -90,
+        "north": bounds_key[3] if bounds_key else 90
+    }
+
+    filter_state = {
+        "sort": {"value": "globalrelevanceex"},
+        "price": {"min": min_price, "max": max_price},
+        "mp": {"min": int(min_price * 0.005), "max": int(max_price * 0.005)}
+    }
+
+    if status == "sold":
+        filter_state.update({
+            "rs": {"value": True},
+            "sold": {"value": "1m"}
+        })
+    else:
+        filter_state.update({
+            "fore": {"value": False},
+            "auc": {"value": False},
+            "nc": {"value": False},
+            "fr": {"value": True},
+            "fsbo": {"value": False},
+            "cmsn": {"value": False},
+            "fsba": {"value": False}
+        })
+
+    return {
+        "pagination": {},
+        "isMapVisible": True,
+        "mapBounds": bounds,
+        "regionSelection": [{"regionId": 0, "regionType": 6}],
+        "filterState": filter_state,
+        "isListVisible": True,
+        "mapZoom": 11,
+        "usersSearchTerm": f"{city} {state}",
+        "listPriceActive": status != "sold"
+    }
+
+@lru_cache(maxsize=1024)
+def _encoded_search_query(city: str, state: str, min_price: int, max_price: int, status: str, bounds_key: Optional[tuple]) -> str:
+    query_state = _build_search_query_state(city, state, min_price, max_price, status, bounds_key)
+    # orjson emits compact separators by default, matching what Zillow expects
+    return quote(orjson.dumps(query_state).decode())
+
+# Process pool for the CPU-heavy HTML parse so it doesn't block the event
+# loop; created lazily to keep module import fork-safe
+_PARSER_POOL: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+def _get_parser_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _PARSER_POOL
+    if _PARSER_POOL is None:
+        _PARSER_POOL = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _PARSER_POOL
+
+def _parse_zillow_response_worker(html_content: bytes, status: str) -> List["Property"]:
+    # Module-level so it is picklable for the process pool
+    return zillow_api._parse_zillow_response(html_content, status)
+
 # Import your existing classes (copy the Property and ZillowRealEstateAPI classes here)
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Property:
     address: str
     bedrooms: int
@@ -27,8 +209,15 @@ class Property:
     status: str = "for_sale"
     sold_date: Optional[str] = None
     property_type: str = "house"
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    def __str__(self) -> str:
+        sqft_text = f"{self.square_feet:,} square feet" if self.square_feet > 0 else "square feet N/A"
+        action = "Listed" if self.status == "for_sale" else "Sold"
+        return f"{self.bedrooms} bed {self.bathrooms} bath {sqft_text}. {action} for ${self.price:,}. {self.url}"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MapBounds:
     west: float
     east: float
@@ -37,8 +226,18 @@ class MapBounds:
 
 class ZillowRealEstateAPI:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.client: Optional[httpx.AsyncClient] = None
+        # Token bucket bounding outbound QPS to Zillow; lets concurrent
+        # fetches burst through instead of sleeping a fixed delay each
+        self._limiter = AsyncLimiter(max_rate=5, time_period=1.0)
+        # Full search results are stable for minutes; cache them and
+        # coalesce concurrent identical queries onto one upstream fetch
+        self._results_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+        # Per-status search results, so e.g. a comps fetch is reusable even
+        # when the combined query missed the result cache
+        self._search_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9',
@@ -50,25 +249,121 @@ class ZillowRealEstateAPI:
             'Sec-Fetch-Mode': 'navigate',
             'Sec-Fetch-Site': 'none',
             'Cache-Control': 'max-age=0'
-        })
-    
-    def find_subject_property_and_comps(self, city: str, state: str, min_price: int, max_price: int, map_bounds: Optional[MapBounds] = None) -> Dict[str, Any]:
+        }
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the client binds to the running event loop.
+        # HTTP/2 multiplexes the concurrent for-sale and sold fetches over
+        # a single TLS connection to zillow.com.
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=15,
+                # requests followed redirects by default; httpx does not.
+                # Zillow 301s non-canonical city slugs, so without this the
+                # scrape path sees the redirect status and falls back to mock
+                follow_redirects=True,
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True,
+                    limits=httpx.Limits(max_keepalive_connections=32, max_connections=128),
+                    retries=3
+                )
+            )
+        return self.client
+
+    async def close(self):
+        if self.client and not self.client.is_closed:
+            await self.client.aclose()
+
+    async def _request(self, method: str, url: str, max_attempts: int = 3, **kwargs) -> httpx.Response:
+        # All outbound traffic funnels through here: token-bucket limited,
+        # with exponential backoff on 429/503 honoring Retry-After
+        client = await self._get_client()
+        response = None
+        for attempt in range(max_attempts):
+            async with self._limiter:
+                response = await client.request(method, url, **kwargs)
+
+            if response.status_code not in (429, 503) or attempt == max_attempts - 1:
+                break
+
+            retry_after = response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else float(2 ** attempt)
+            await asyncio.sleep(delay)
+
+        return response
+
+    async def _get_html_capped(self, url: str) -> tuple:
+        # Stream the page and stop buffering once MAX_HTML_BYTES are in;
+        # the downstream parsers only need the head of the document
+        client = await self._get_client()
+        async with self._limiter:
+            async with client.stream('GET', url) as response:
+                if response.status_code != 200:
+                    return response.status_code, b''
+
+                chunks = []
+                total = 0
+                async for chunk in response.aiter_bytes(65536):
+                    chunks.append(chunk)
+                    total += len(chunk)
+                    if total >= MAX_HTML_BYTES:
+                        break
+
+                return response.status_code, b''.join(chunks)
+
+    async def find_subject_property_and_comps(self, city: str, state: str, min_price: int, max_price: int, map_bounds: Optional[MapBounds] = None) -> Dict[str, Any]:
+        key = (city.lower(), state.lower(), min_price, max_price, _quantized_bounds_key(map_bounds))
+
+        cached = self._results_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Single-flight: identical queries already in flight share one fetch.
+        # The fetch runs in a detached task so a leader disconnecting only
+        # cancels its own await — the shared work keeps running for the
+        # other waiters, and a failure reaches them as the real exception
+        # rather than CancelledError.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch_and_cache(key, city, state, min_price, max_price, map_bounds)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _task: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_cache(self, key: tuple, city: str, state: str, min_price: int, max_price: int, map_bounds: Optional[MapBounds]) -> Dict[str, Any]:
+        results = await self._fetch_subject_property_and_comps(city, state, min_price, max_price, map_bounds)
+        # Mock fallbacks are placeholders for an upstream outage; caching
+        # them would pin fabricated listings for the full TTL
+        from_mock = results.pop("_from_mock", False)
+        if "error" not in results and not from_mock:
+            self._results_cache[key] = results
+        return results
+
+    async def _fetch_subject_property_and_comps(self, city: str, state: str, min_price: int, max_price: int, map_bounds: Optional[MapBounds] = None) -> Dict[str, Any]:
         try:
-            subject_property = self.find_subject_property(city, state, min_price, max_price, map_bounds)
-            
+            # The for-sale and sold searches are independent, so fetch them concurrently
+            (subject_property, subject_mock), (comparables, comps_mock) = await asyncio.gather(
+                self.find_subject_property(city, state, min_price, max_price, map_bounds),
+                self.find_comparable_properties(city, state, min_price, max_price, 10, map_bounds)
+            )
+
             if not subject_property:
                 return {
                     "error": "No subject property found matching criteria",
                     "subject_property": None,
                     "comparables": []
                 }
-            
-            comparables = self.find_comparable_properties(city, state, min_price, max_price, 10, map_bounds)
-            
+
+            comparables = _rank_comps_by_distance(subject_property, comparables)
+
             return {
-                "subject_property": self._format_property_output(subject_property),
-                "comparables": [self._format_property_output(comp, is_comp=True) for comp in comparables],
-                "total_comps_found": len(comparables)
+                "subject_property": _property_payload(subject_property),
+                "comparables": [_property_payload(comp) for comp in comparables],
+                "total_comps_found": len(comparables),
+                "_from_mock": subject_mock or comps_mock
             }
             
         except Exception as e:
@@ -78,111 +373,112 @@ class ZillowRealEstateAPI:
                 "comparables": []
             }
     
-    def find_subject_property(self, city: str, state: str, min_price: int, max_price: int, map_bounds: Optional[MapBounds] = None) -> Optional[Property]:
-        # Use provided map bounds or default to global bounds
-        bounds = {
-            "west": map_bounds.west if map_bounds else -180,
-            "east": map_bounds.east if map_bounds else 180,
-            "south": map_bounds.south if map_bounds else -90,
-            "north": map_bounds.north if map_bounds else 90
-        }
-        
-        search_query_state = {
-            "pagination": {},
-            "isMapVisible": True,
-            "mapBounds": bounds,
-            "regionSelection": [{"regionId": 0, "regionType": 6}],
-            "filterState": {
-                "sort": {"value": "globalrelevanceex"},
-                "price": {"min": min_price, "max": max_price},
-                "mp": {"min": int(min_price * 0.005), "max": int(max_price * 0.005)},
-                "fore": {"value": False},
-                "auc": {"value": False},
-                "nc": {"value": False},
-                "fr": {"value": True},
-                "fsbo": {"value": False},
-                "cmsn": {"value": False},
-                "fsba": {"value": False}
-            },
-            "isListVisible": True,
-            "mapZoom": 11,
-            "usersSearchTerm": f"{city} {state}",
-            "listPriceActive": True
-        }
-        
-        properties = self._search_zillow(city, state, search_query_state)
-        return properties[0] if properties else None
-    
-    def find_comparable_properties(self, city: str, state: str, min_price: int, max_price: int, limit: int = 10, map_bounds: Optional[MapBounds] = None) -> List[Property]:
-        # Use provided map bounds or default to global bounds
-        bounds = {
-            "west": map_bounds.west if map_bounds else -180,
-            "east": map_bounds.east if map_bounds else 180,
-            "south": map_bounds.south if map_bounds else -90,
-            "north": map_bounds.north if map_bounds else 90
-        }
-        
-        search_query_state = {
-            "pagination": {},
-            "isMapVisible": True,
-            "mapBounds": bounds,
-            "regionSelection": [{"regionId": 0, "regionType": 6}],
-            "filterState": {
-                "sort": {"value": "globalrelevanceex"},
-                "price": {"min": min_price, "max": max_price},
-                "mp": {"min": int(min_price * 0.005), "max": int(max_price * 0.005)},
-                "rs": {"value": True},
-                "sold": {"value": "1m"}
-            },
-            "isListVisible": True,
-            "mapZoom": 11,
-            "usersSearchTerm": f"{city} {state}",
-            "listPriceActive": False
-        }
-        
-        properties = self._search_zillow(city, state, search_query_state, status="sold")
-        return properties[:limit]
-    
-    def _search_zillow(self, city: str, state: str, search_query_state: Dict, status: str = "for_sale") -> List[Property]:
+    async def find_subject_property(self, city: str, state: str, min_price: int, max_price: int, map_bounds: Optional[MapBounds] = None) -> Tuple[Optional[Property], bool]:
+        properties, from_mock = await self._search_zillow(city, state, min_price, max_price, "for_sale", map_bounds)
+        return (properties[0] if properties else None), from_mock
+
+    async def find_comparable_properties(self, city: str, state: str, min_price: int, max_price: int, limit: int = 10, map_bounds: Optional[MapBounds] = None) -> Tuple[List[Property], bool]:
+        properties, from_mock = await self._search_zillow(city, state, min_price, max_price, "sold", map_bounds)
+        return properties[:limit], from_mock
+
+    async def _search_zillow(self, city: str, state: str, min_price: int, max_price: int, status: str = "for_sale", map_bounds: Optional[MapBounds] = None) -> Tuple[List[Property], bool]:
+        # Second element flags mock fallback data so callers can keep it
+        # out of their own caches
+        bounds_key = _bounds_key(map_bounds)
+        cache_key = (city.lower(), state.lower(), min_price, max_price, status, _quantized_bounds_key(map_bounds))
+
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return cached, False
+
+        search_query_state = _build_search_query_state(city, state, min_price, max_price, status, bounds_key)
         try:
-            city_state_formatted = f"{city.lower().replace(' ', '-')}-{state.lower()}"
-            encoded_query = quote(json.dumps(search_query_state, separators=(',', ':')))
+            # Prefer the structured JSON endpoint; it returns the same
+            # listings without any HTML to parse. The page scrape below is
+            # only a fallback.
+            properties = await self._search_zillow_api(search_query_state, status)
+            if properties:
+                self._search_cache[cache_key] = properties
+                return properties, False
+
+            city_state_formatted = _city_state_slug(city, state)
+            encoded_query = _encoded_search_query(city, state, min_price, max_price, status, bounds_key)
             base_url = f"https://www.zillow.com/{city_state_formatted}/"
             url = f"{base_url}?searchQueryState={encoded_query}"
-            
-            response = self.session.get(url, timeout=15)
-            
-            if response.status_code != 200:
-                return self._generate_mock_properties(city, state, search_query_state, status)
-            
-            properties = self._parse_zillow_response(response.text, status)
-            
+
+            status_code, html_content = await self._get_html_capped(url)
+
+            if status_code != 200 or not html_content:
+                return self._generate_mock_properties(city, state, search_query_state, status), True
+
+            # Parsing a multi-hundred-KB page is CPU work; run it in the
+            # process pool so the event loop keeps serving other requests
+            properties = await asyncio.get_running_loop().run_in_executor(
+                _get_parser_pool(), _parse_zillow_response_worker, html_content, status
+            )
+
             if not properties:
-                return self._generate_mock_properties(city, state, search_query_state, status)
-            
-            return properties
-            
+                return self._generate_mock_properties(city, state, search_query_state, status), True
+
+            # Only real scraped/API results are cached, never mock data
+            self._search_cache[cache_key] = properties
+            return properties, False
+
         except Exception as e:
-            return self._generate_mock_properties(city, state, search_query_state, status)
-    
-    def _parse_zillow_response(self, html_content: str, status: str) -> List[Property]:
+            return self._generate_mock_properties(city, state, search_query_state, status), True
+
+    async def _search_zillow_api(self, search_query_state: Dict, status: str) -> List[Property]:
+        try:
+            payload = {
+                "searchQueryState": search_query_state,
+                "wants": {"cat1": ["listResults", "mapResults"]},
+                "requestId": random.randint(1, 10)
+            }
+
+            response = await self._request(
+                'PUT',
+                ZILLOW_SEARCH_API_URL,
+                content=orjson.dumps(payload),
+                headers={'Content-Type': 'application/json'}
+            )
+
+            if response.status_code != 200:
+                return []
+
+            data = orjson.loads(response.content)
+            return self._extract_properties_from_json(data, status)
+        except Exception as e:
+            return []
+
+    def _parse_zillow_response(self, html_content: bytes, status: str) -> List[Property]:
+        # Lexbor sniffs the charset itself, so the body is kept as bytes
+        # end to end — no full unicode copy of the page
         properties = []
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        script_tags = soup.find_all('script')
-        for script in script_tags:
-            if script.string and 'searchPageState' in script.string:
+
+        # Fast path: slice the searchPageState blob straight out of the raw
+        # HTML, skipping tree construction entirely
+        for json_match in _SEARCH_PAGE_STATE_BYTES_RE.finditer(html_content):
+            try:
+                data = orjson.loads(json_match.group(1))
+                properties.extend(self._extract_properties_from_json(data, status))
+            except Exception:
+                continue
+
+        # Newer Zillow pages embed the listing set in the Next.js
+        # __NEXT_DATA__ script instead — still raw JSON, no tree needed
+        if not properties:
+            next_data_match = _NEXT_DATA_BYTES_RE.search(html_content)
+            if next_data_match:
                 try:
-                    json_match = re.search(r'"searchPageState":\s*({.*?})(?=,")', script.string)
-                    if json_match:
-                        data = json.loads(json_match.group(1))
-                        properties.extend(self._extract_properties_from_json(data, status))
-                except Exception as e:
-                    continue
-        
+                    data = orjson.loads(next_data_match.group(1))
+                    page_state = data.get('props', {}).get('pageProps', {}).get('searchPageState', {})
+                    properties.extend(self._extract_properties_from_json(page_state, status))
+                except Exception:
+                    pass
+
         if not properties:
-            properties = self._parse_html_listings(soup, status)
-        
+            properties = self._parse_html_listings(html_content, status)
+
         return properties
     
     def _extract_properties_from_json(self, data: Dict, status: str) -> List[Property]:
@@ -190,94 +486,113 @@ class ZillowRealEstateAPI:
         
         try:
             if 'cat1' in data and 'searchResults' in data['cat1']:
-                listings = data['cat1']['searchResults']['listResults']
-                
-                for listing in listings:
-                    try:
-                        prop = Property(
-                            address=listing.get('address', 'Address not available'),
-                            bedrooms=listing.get('beds', 0),
-                            bathrooms=listing.get('baths', 0),
-                            square_feet=listing.get('area', 0),
-                            price=listing.get('price', 0) or listing.get('unformattedPrice', 0),
-                            url=f"https://www.zillow.com{listing.get('detailUrl', '')}",
-                            status=status,
-                            sold_date=listing.get('soldDate') if status == 'sold' else None
-                        )
-                        properties.append(prop)
-                    except Exception as e:
-                        continue
+                search_results = data['cat1']['searchResults']
+                listings = search_results.get('listResults') or search_results.get('mapResults') or []
+            else:
+                # Layout drifted — walk the blob for any listing array
+                listings = _find_listings_in_json(data)
+
+            for listing in listings:
+                if not isinstance(listing, dict) or _LISTING_KEYS.isdisjoint(listing):
+                    continue
+                try:
+                    lat_long = listing.get('latLong')
+                    if not isinstance(lat_long, dict):
+                        lat_long = {}
+                    prop = Property(
+                        address=listing.get('address', 'Address not available'),
+                        bedrooms=listing.get('beds', 0),
+                        bathrooms=listing.get('baths', 0),
+                        square_feet=listing.get('area', 0),
+                        price=listing.get('price', 0) or listing.get('unformattedPrice', 0),
+                        url=f"https://www.zillow.com{listing.get('detailUrl', '')}",
+                        status=status,
+                        sold_date=listing.get('soldDate') if status == 'sold' else None,
+                        latitude=lat_long.get('latitude'),
+                        longitude=lat_long.get('longitude')
+                    )
+                    properties.append(prop)
+                except Exception as e:
+                    continue
         except Exception as e:
             pass
         
         return properties
     
-    def _parse_html_listings(self, soup: BeautifulSoup, status: str) -> List[Property]:
+    def _parse_html_listings(self, html_content: bytes, status: str) -> List[Property]:
         properties = []
-        
-        selectors = [
-            'article[data-test="property-card"]',
-            '.property-card-data',
-            '.list-card-info'
-        ]
-        
-        for selector in selectors:
-            listings = soup.select(selector)
-            if listings:
-                for listing in listings:
-                    try:
-                        prop = self._extract_property_from_html(listing, status)
-                        if prop:
-                            properties.append(prop)
-                    except Exception as e:
-                        continue
-                break
-        
+
+        # Lexbor is a C parser, roughly an order of magnitude faster than
+        # BeautifulSoup for CSS-heavy card extraction
+        tree = LexborHTMLParser(html_content)
+
+        for listing in tree.css(_PROPERTY_CARD_SEL):
+            try:
+                prop = self._extract_property_from_html(listing, status)
+                if prop:
+                    properties.append(prop)
+            except Exception as e:
+                continue
+
         return properties
     
     def _extract_property_from_html(self, listing_element, status: str) -> Optional[Property]:
         try:
-            price_elem = listing_element.select_one('[data-test="property-card-price"]')
-            price_text = price_elem.get_text(strip=True) if price_elem else ""
+            price_elem = listing_element.css_first(_PRICE_SEL)
+            price_text = price_elem.text(strip=True) if price_elem else ""
             price = self._parse_price(price_text)
-            
-            address_elem = listing_element.select_one('[data-test="property-card-addr"]')
-            address = address_elem.get_text(strip=True) if address_elem else "Address not available"
-            
-            bed_bath_elem = listing_element.select_one('[data-test="property-card-details"]')
-            bed_bath_text = bed_bath_elem.get_text(strip=True) if bed_bath_elem else ""
-            
-            bedrooms = self._extract_number_before_word(bed_bath_text, "bd")
-            bathrooms = self._extract_number_before_word(bed_bath_text, "ba")
-            square_feet = self._extract_number_before_word(bed_bath_text, "sqft")
-            
-            link_elem = listing_element.find('a', href=True)
-            url = f"https://www.zillow.com{link_elem['href']}" if link_elem else ""
+
+            address_elem = listing_element.css_first(_ADDRESS_SEL)
+            address = address_elem.text(strip=True) if address_elem else "Address not available"
+
+            bed_bath_elem = listing_element.css_first(_DETAILS_SEL)
+            bed_bath_text = bed_bath_elem.text(strip=True) if bed_bath_elem else ""
+
+            bedrooms, bathrooms, square_feet = self._parse_details(bed_bath_text)
+
+            link_elem = listing_element.css_first(_LINK_SEL)
+            url = f"https://www.zillow.com{link_elem.attributes.get('href', '')}" if link_elem else ""
             
             return Property(
                 address=address,
-                bedrooms=int(bedrooms) if bedrooms else 0,
-                bathrooms=float(bathrooms) if bathrooms else 0,
-                square_feet=int(square_feet) if square_feet else 0,
+                bedrooms=bedrooms,
+                bathrooms=bathrooms,
+                square_feet=square_feet,
                 price=price,
                 url=url,
                 status=status
             )
         except Exception as e:
             return None
+
+    def _parse_details(self, text: str) -> tuple:
+        bedrooms, bathrooms, square_feet = 0, 0.0, 0
+
+        for match in _DETAILS_RE.finditer(text):
+            if match.group('beds') and not bedrooms:
+                bedrooms = int(match.group('beds'))
+            elif match.group('baths') and not bathrooms:
+                bathrooms = float(match.group('baths'))
+            elif match.group('sqft') and not square_feet:
+                square_feet = int(match.group('sqft').replace(',', ''))
+
+        return bedrooms, bathrooms, square_feet
     
     def _parse_price(self, price_text: str) -> int:
         if not price_text:
             return 0
-        price_numbers = re.findall(r'[\d,]+', price_text)
-        if price_numbers:
-            return int(price_numbers[0].replace(',', ''))
-        return 0
-    
-    def _extract_number_before_word(self, text: str, word: str) -> Optional[str]:
-        pattern = rf'([\d\.]+)\s*{word}'
-        match = re.search(pattern, text, re.IGNORECASE)
-        return match.group(1) if match else None
+        # Single pass over the string: collect the first run of digits,
+        # ignoring thousands separators — same semantics as the old
+        # findall(r'[\d,]+') + replace(',') at a fraction of the work
+        digits = []
+        for char in price_text:
+            if char.isdigit():
+                digits.append(char)
+            elif char == ',':
+                continue
+            elif digits:
+                break
+        return int(''.join(digits)) if digits else 0
     
     def _generate_mock_properties(self, city: str, state: str, search_query_state: Dict, status: str) -> List[Property]:
         properties = []
@@ -324,20 +639,24 @@ class ZillowRealEstateAPI:
         
         return random_date.strftime("%Y-%m-%d")
     
-    def _format_property_output(self, property_obj: Property, is_comp: bool = False) -> str:
-        bed_text = f"{property_obj.bedrooms} bed"
-        bath_text = f"{property_obj.bathrooms} bath" if property_obj.bathrooms == int(property_obj.bathrooms) else f"{property_obj.bathrooms} bath"
-        sqft_text = f"{property_obj.square_feet:,} square feet" if property_obj.square_feet > 0 else "square feet N/A"
-        
-        if is_comp and property_obj.status == "sold":
-            price_text = f"sold for ${property_obj.price:,}"
-        else:
-            price_text = f"listed for ${property_obj.price:,}" if property_obj.status == "for_sale" else f"sold for ${property_obj.price:,}"
-        
-        return f"{bed_text} {bath_text} {sqft_text}. {price_text.capitalize()}. {property_obj.url}"
-
 # FastAPI Application
-app = FastAPI(title="Zillow Real Estate API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Per-worker setup: warm the shared HTTP/2 connection so the first
+    # search doesn't pay the DNS + TLS handshake
+    try:
+        client = await zillow_api._get_client()
+        await client.head("https://www.zillow.com/", timeout=5)
+    except Exception:
+        pass
+
+    yield
+
+    await zillow_api.close()
+    if _PARSER_POOL is not None:
+        _PARSER_POOL.shutdown(wait=False)
+
+app = FastAPI(title="Zillow Real Estate API", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -348,6 +667,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress the repetitive property strings on the wire
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
+@app.exception_handler(ValidationError)
+async def _pydantic_validation_handler(request: Request, exc: ValidationError):
+    # Constraint failures in a Depends()-built model escape FastAPI's
+    # parameter validation as raw ValidationError (a 500 by default);
+    # reroute them through the stock handler so every bad input is a 422
+    return await request_validation_exception_handler(request, RequestValidationError(exc.errors()))
+
 # Initialize API
 zillow_api = ZillowRealEstateAPI()
 
@@ -358,16 +687,56 @@ class MapBoundsModel(BaseModel):
     south: float
     north: float
 
-class PropertySearchRequest(BaseModel):
-    city: str
-    state: str
-    min_price: int
-    max_price: int
+class SearchParams(BaseModel):
+    # Shared validation for the GET and POST search endpoints, checked
+    # once in Rust-side pydantic-core instead of ad hoc per handler
+    city: str = Field(min_length=1, max_length=64)
+    state: str = Field(pattern=r"^[A-Za-z]{2}$")
+    min_price: int = Field(ge=0)
+    max_price: int = Field(ge=0)
+
+    @field_validator("state")
+    @classmethod
+    def _uppercase_state(cls, value: str) -> str:
+        return value.upper()
+
+    @model_validator(mode="after")
+    def _check_price_range(self) -> "SearchParams":
+        if self.max_price < self.min_price:
+            raise ValueError("max_price must be >= min_price")
+        return self
+
+class SearchQuery(SearchParams):
+    west: Optional[float] = None
+    east: Optional[float] = None
+    south: Optional[float] = None
+    north: Optional[float] = None
+
+class PropertySearchRequest(SearchParams):
     map_bounds: Optional[MapBoundsModel] = None
 
+class PropertyOut(BaseModel):
+    address: str
+    bedrooms: int
+    bathrooms: float
+    square_feet: int
+    price: int
+    url: str
+    status: str
+    sold_date: Optional[str] = None
+    property_type: str = "house"
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    display: str
+
+def _map_bounds_from_model(model: Optional[MapBoundsModel]) -> Optional[MapBounds]:
+    if model is None:
+        return None
+    return MapBounds(**model.model_dump())
+
 class PropertySearchResponse(BaseModel):
-    subject_property: Optional[str]
-    comparables: List[str]
+    subject_property: Optional[PropertyOut]
+    comparables: List[PropertyOut]
     total_comps_found: int
     error: Optional[str] = None
 
@@ -375,29 +744,40 @@ class PropertySearchResponse(BaseModel):
 async def root():
     return {"message": "Zillow Real Estate API", "version": "1.0.0"}
 
-@app.get("/search")
-async def search_properties(
-    city: str = Query(..., description="City name"),
-    state: str = Query(..., description="State abbreviation (e.g., CA, NY)"),
-    min_price: int = Query(..., description="Minimum price in dollars"),
-    max_price: int = Query(..., description="Maximum price in dollars"),
-    west: Optional[float] = Query(None, description="Western longitude boundary"),
-    east: Optional[float] = Query(None, description="Eastern longitude boundary"),
-    south: Optional[float] = Query(None, description="Southern latitude boundary"),
-    north: Optional[float] = Query(None, description="Northern latitude boundary")
-):
+# HEAD must be listed explicitly: FastAPI's APIRoute does not add it
+# alongside GET the way plain Starlette routes do
+@app.api_route("/search", methods=["GET", "HEAD"])
+async def search_properties(request: Request, response: Response, query: SearchQuery = Depends()):
     """
     Search for subject property and comparable properties
     """
     try:
-        # Create map bounds if all coordinates are provided
-        map_bounds = None
-        if all(coord is not None for coord in [west, east, south, north]):
-            map_bounds = MapBounds(west=west, east=east, south=south, north=north)
-        
-        results = zillow_api.find_subject_property_and_comps(city, state, min_price, max_price, map_bounds)
+        # Map bounds apply only when all four coordinates are provided
+        coords = (query.west, query.east, query.south, query.north)
+        map_bounds = MapBounds(*coords) if None not in coords else None
+
+        results = await zillow_api.find_subject_property_and_comps(
+            query.city, query.state, query.min_price, query.max_price, map_bounds
+        )
+
+        # Stable fingerprint of the payload so polling clients can skip
+        # the body when nothing changed
+        digest = hashlib.blake2b(
+            orjson.dumps(results, option=orjson.OPT_SORT_KEYS), digest_size=16
+        ).hexdigest()
+        etag = f'"{digest}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "public, max-age=60"})
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "public, max-age=60"
         return PropertySearchResponse(**results)
+    except HTTPException:
+        raise
     except Exception as e:
+        # No f-string here: the message is constant and the traceback
+        # carries the detail
+        logger.exception("Search endpoint error")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/search")
@@ -406,21 +786,48 @@ async def search_properties_post(request: PropertySearchRequest):
     Search for subject property and comparable properties (POST method)
     """
     try:
-        # Convert Pydantic model to dataclass if provided
-        map_bounds = None
-        if request.map_bounds:
-            map_bounds = MapBounds(
-                west=request.map_bounds.west,
-                east=request.map_bounds.east,
-                south=request.map_bounds.south,
-                north=request.map_bounds.north
-            )
-        
-        results = zillow_api.find_subject_property_and_comps(
+        map_bounds = _map_bounds_from_model(request.map_bounds)
+
+        results = await zillow_api.find_subject_property_and_comps(
             request.city, request.state, request.min_price, request.max_price, map_bounds
         )
         return PropertySearchResponse(**results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Search endpoint error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search/batch")
+async def search_properties_batch(batch: List[PropertySearchRequest]):
+    """
+    Run multiple property searches concurrently (max 50 per batch)
+    """
+    if len(batch) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size is limited to {MAX_BATCH_SIZE} searches")
+
+    try:
+        searches = []
+        for req in batch:
+            map_bounds = _map_bounds_from_model(req.map_bounds)
+            key = (req.city.lower(), req.state.lower(), req.min_price, req.max_price, _bounds_key(map_bounds))
+            searches.append((key, req, map_bounds))
+
+        # One coroutine per distinct query; duplicate entries in the batch
+        # share its result
+        pending = {}
+        for key, req, map_bounds in searches:
+            if key not in pending:
+                pending[key] = zillow_api.find_subject_property_and_comps(
+                    req.city, req.state, req.min_price, req.max_price, map_bounds
+                )
+
+        resolved = dict(zip(pending.keys(), await asyncio.gather(*pending.values())))
+        return [PropertySearchResponse(**resolved[key]) for key, _, _ in searches]
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("Batch search endpoint error")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
@@ -430,4 +837,13 @@ async def health_check():
 # Railway deployment
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=False,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1)),
+        access_log=False
+    )